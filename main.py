@@ -4,11 +4,36 @@ from src.utils import load_stopwords
 from src.preprocessor import DataPreprocessor
 from src.text_mining import TextMiner
 from src.visualization import Visualizer
+from src.memory_budget import MemoryBudget
+from src.async_writer import BackgroundWriter
 
 DATA_DIR = "/Users/younny/Documents/work/projects/PycharmProjects/dataHandler/data"
 OUTPUT_DIR = "/Users/younny/Documents/work/projects/PycharmProjects/dataHandler/output"
+# Set to a size in MB to run with compact dtypes, spilling and a peak-memory report
+MEMORY_BUDGET_MB = None
 
-def main():
+# Base topics of labels that whitespace does not split, for the topic correlation
+# heatmaps. Labels not listed here are split on whitespace ('中国 日本 台湾').
+BASE_TOPIC_MAP = {
+    # English (BBC file names)
+    'China-Japan Diplomacy': ['China', 'Japan'],
+    'China-US Relations': ['China', 'US'],
+    'Japan Contingency': ['Japan'],
+    'Taiwan Issue': ['Taiwan'],
+    # Chinese (Weibo folder names)
+    '中日': ['中国', '日本'],
+    '中日关系': ['中国', '日本'],
+    '中日外交': ['中国', '日本'],
+    '中美': ['中国', '美国'],
+    '中美关系': ['中国', '美国'],
+    '台湾问题': ['台湾'],
+    '台湾有事': ['台湾'],
+    '日本有事': ['日本'],
+    # People's Daily files share the folder label 'people', which names no topic
+    'people': [],
+}
+
+def run_pipeline(writer, budget=None):
     # Setup
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
@@ -19,23 +44,29 @@ def main():
     # 1. Loading & Cleaning
     print("Initializing Preprocessor...")
     preprocessor = DataPreprocessor(stopwords)
-    
+
     print(f"Loading and processing data from {DATA_DIR}...")
     df_en, df_cn = preprocessor.load_and_clean_data(DATA_DIR)
+    if budget:
+        budget.checkpoint("load & clean")
     
     # 2. Process English Pipeline
     print(f"--- English Pipeline ({len(df_en)} docs) ---")
     if not df_en.empty:
-        en_miner = TextMiner(OUTPUT_DIR, "en")
+        en_miner = TextMiner(OUTPUT_DIR, "en", memory_budget=budget, correlation=True,
+                             topic_map=BASE_TOPIC_MAP, writer=writer)
         en_miner.process(df_en)
+        en_miner.save_model(preprocessor)
     else:
         print("No English data found.")
         
     # 3. Process Chinese Pipeline
     print(f"--- Chinese Pipeline ({len(df_cn)} docs) ---")
     if not df_cn.empty:
-        cn_miner = TextMiner(OUTPUT_DIR, "cn")
+        cn_miner = TextMiner(OUTPUT_DIR, "cn", memory_budget=budget, correlation=True,
+                             topic_map=BASE_TOPIC_MAP, writer=writer)
         cn_miner.process(df_cn)
+        cn_miner.save_model(preprocessor)
     else:
         print("No Chinese data found.")
         
@@ -46,7 +77,7 @@ def main():
         cn_font_path = None
         print("Warning: Chinese font not found at default path. WordCloud might contain boxes.")
 
-    visualizer = Visualizer(OUTPUT_DIR, font_path=cn_font_path)
+    visualizer = Visualizer(OUTPUT_DIR, font_path=cn_font_path, writer=writer)
     
     print("Generating English Word Cloud...")
     if not df_en.empty:
@@ -57,6 +88,8 @@ def main():
         visualizer.generate_wordcloud(df_cn, "cn")
         
     # 5. Heatmap
+    # The heatmaps read the CSVs back, so every pending write must be on disk first
+    writer.flush()
     print("Generating English Heatmap...")
     en_tfidf_path = os.path.join(OUTPUT_DIR, "en_tfidf_chi.csv")
     visualizer.generate_heatmap(en_tfidf_path, "en")
@@ -64,8 +97,35 @@ def main():
     print("Generating Chinese Heatmap...")
     cn_tfidf_path = os.path.join(OUTPUT_DIR, "cn_tfidf_chi.csv")
     visualizer.generate_heatmap(cn_tfidf_path, "cn")
+
+    # 6. Topic Correlation Heatmaps
+    print("Generating Topic Correlation Heatmaps...")
+    for lang in ["en", "cn"]:
+        corr_path = os.path.join(OUTPUT_DIR, f"{lang}_topic_correlation.csv")
+        if os.path.exists(corr_path):
+            corr_df = pd.read_csv(corr_path, index_col=0)
+            visualizer.generate_correlation_heatmap(corr_df, os.path.join(OUTPUT_DIR, f"{lang}_topic_correlation.png"))
     
+    writer.flush()
+
+    if budget:
+        budget.checkpoint("visualization")
+        budget.report()
+
     print("All tasks completed.")
 
+def main():
+    # Outputs are serialized in the background while the next stage computes.
+    # Leaving the block waits for every pending write, even if the run fails,
+    # and re-raises any write error.
+    budget = MemoryBudget(MEMORY_BUDGET_MB) if MEMORY_BUDGET_MB else None
+    try:
+        with BackgroundWriter(max_pending=4) as writer:
+            run_pipeline(writer, budget)
+    finally:
+        # Spill files hold full matrix copies; remove them even if the run fails
+        if budget:
+            budget.cleanup()
+
 if __name__ == "__main__":
     main()
@@ -1,19 +1,37 @@
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
+import sys
 import os
+import pandas as pd
+from src.visualization import Visualizer
+
+DEFAULT_CORR_PATH = os.path.join("output", "cn_topic_correlation.csv")
+
+
+def load_correlation(csv_path, slice_key=None):
+    """Load a correlation matrix written by TextMiner (correlation=True).
+
+    Square files (*_label_correlation.csv, *_topic_correlation.csv) are read as is.
+    For per-slice files (*_topic_correlation_{freq}.csv) the pairs of ``slice_key``
+    are pivoted back into a symmetric matrix.
+    """
+    df = pd.read_csv(csv_path, index_col=0 if slice_key is None else None)
+    if slice_key is None:
+        return df
 
-def plot_heatmap():
-    # Data
-    data = {
-        '主题1': [1.000, 0.738, 0.231, 0.221],
-        '主题2': [0.738, 1.000, 0.299, 0.357],
-        '主题3': [0.231, 0.299, 1.000, 0.223],
-        '主题4': [0.221, 0.357, 0.223, 1.000]
-    }
-    index = ['主题1', '主题2', '主题3', '主题4']
-    df = pd.DataFrame(data, index=index)
+    pairs = df[df['slice'].astype(str) == str(slice_key)]
+    groups = sorted(set(pairs['group_a']) | set(pairs['group_b']))
+    matrix = pd.DataFrame(1.0, index=groups, columns=groups)
+    for a, b, sim in zip(pairs['group_a'], pairs['group_b'], pairs['similarity']):
+        matrix.loc[a, b] = sim
+        matrix.loc[b, a] = sim
+    return matrix
+
+
+def plot_heatmap(csv_path=DEFAULT_CORR_PATH, output_path='theme_correlation_heatmap.png', slice_key=None):
+    if not os.path.exists(csv_path):
+        print(f"Correlation file not found: {csv_path}. Run main.py with correlation enabled first.")
+        return
+
+    df = load_correlation(csv_path, slice_key)
 
     # Font Setup for Chinese on Mac
     # Try to find a suitable Chinese font
@@ -21,30 +39,20 @@ def plot_heatmap():
     if not os.path.exists(font_path):
         # Fallback to common Mac Chinese fonts
         font_path = '/System/Library/Fonts/PingFang.ttc' 
-    
-    if os.path.exists(font_path):
-        prop = fm.FontProperties(fname=font_path)
-        plt.rcParams['font.family'] = prop.get_name()
-    else:
+    if not os.path.exists(font_path):
         print("Warning: Chinese font not found, characters may not display correctly.")
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS']
-
-    plt.figure(figsize=(8, 6))
-    
-    # Plot Heatmap
-    # annot=True to show numbers
-    # cmap='coolwarm' or 'YlGnBu' for good contrast
-    # vmin=0, vmax=1 for correlation
-    sns.heatmap(df, annot=True, cmap='Blues', vmin=0, vmax=1, fmt='.3f', 
-                linewidths=1, linecolor='white')
-
-    plt.title('主题相关性热力图', fontsize=15, fontproperties=prop if os.path.exists(font_path) else None)
-    
-    # Save
-    output_path = 'theme_correlation_heatmap.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"Heatmap saved to {output_path}")
-    # plt.show()
+        font_path = None
+
+    title = '主题相关性热力图' if slice_key is None else f'主题相关性热力图 ({slice_key})'
+    visualizer = Visualizer(os.path.dirname(output_path) or '.', font_path=font_path)
+    visualizer.generate_correlation_heatmap(df, output_path, title=title)
+
 
 if __name__ == "__main__":
-    plot_heatmap()
+    # Usage: python plot_theme_heatmap.py [correlation_csv] [output_png] [slice]
+    args = sys.argv[1:]
+    plot_heatmap(
+        args[0] if len(args) > 0 else DEFAULT_CORR_PATH,
+        args[1] if len(args) > 1 else 'theme_correlation_heatmap.png',
+        args[2] if len(args) > 2 else None,
+    )
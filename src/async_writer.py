@@ -0,0 +1,97 @@
+import queue
+import threading
+
+
+class BackgroundWriter:
+    """Run output writes on a background thread while computation continues.
+
+    Jobs run in submission order on a single worker thread. The queue is
+    bounded, so ``submit`` blocks once ``max_pending`` jobs are waiting.
+    That bounds the number of outputs held for writing, not their size; when
+    memory is tight, write synchronously instead. A failed job is
+    re-raised from the next ``submit``, ``flush`` or ``close`` call.
+    ``flush`` is a barrier: it returns once everything submitted so far is
+    on disk. Always finish with ``close`` (or use the writer as a context
+    manager): the worker is a daemon thread, so writes still queued when the
+    interpreter exits without ``close`` would be cut off.
+    """
+
+    def __init__(self, max_pending=4):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._errors = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                fn, args, kwargs, description = job
+                try:
+                    fn(*args, **kwargs)
+                except Exception as e:
+                    with self._lock:
+                        self._errors.append((description, e))
+            finally:
+                self._queue.task_done()
+
+    def _raise_errors(self):
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            description, error = errors[0]
+            if len(errors) > 1:
+                print(f"[{self.__class__.__name__}] {len(errors) - 1} more write(s) failed after {description}.")
+            raise RuntimeError(f"Background write failed ({description}): {error}") from error
+
+    def submit(self, description, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)``; blocks while the queue is full.
+
+        ``description`` names the output (e.g. "BoW -> out/en_bow.csv") in the
+        error raised if the write fails.
+        """
+        if self._closed:
+            raise RuntimeError("BackgroundWriter is closed.")
+        self._raise_errors()
+        self._queue.put((fn, args, kwargs, description))
+
+    def flush(self):
+        """Wait until every submitted write has finished, then surface any error."""
+        self._queue.join()
+        self._raise_errors()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return False
+        # Let pending writes finish, but don't mask the exception already raised
+        try:
+            self.close()
+        except RuntimeError as e:
+            print(f"[{self.__class__.__name__}] {e}")
+        return False
+
+
+def run_write(writer, description, fn, *args, **kwargs):
+    """Hand ``fn`` to ``writer`` if one is given, otherwise run it inline."""
+    if writer is None:
+        fn(*args, **kwargs)
+    else:
+        writer.submit(description, fn, *args, **kwargs)
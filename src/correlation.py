@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, diags
+from sklearn.preprocessing import normalize
+
+
+def split_base_topics(label):
+    """Split a composite label on whitespace, e.g. '中国 日本 台湾' or 'China US Taiwan'."""
+    return str(label).split()
+
+
+def topic_map_fn(topic_map):
+    """Build a ``topic_fn`` that maps labels through ``topic_map``.
+
+    Compound labels that whitespace does not separate ('中日', 'China-US
+    Relations', '台湾问题') need an explicit entry; labels missing from the
+    map fall back to ``split_base_topics``. Map a label to [] to leave its
+    documents out of the topic groups.
+    """
+    def topic_fn(label):
+        key = str(label).strip()
+        if key in topic_map:
+            return list(topic_map[key])
+        return split_base_topics(key)
+    return topic_fn
+
+
+def _group_matrix(keys_per_doc, n_docs):
+    """Row-normalized (groups x docs) indicator matrix; a doc may belong to several groups.
+
+    Returns (group names, matrix, docs per group). Names are sorted, so groups
+    keyed by (slice, topic) tuples come out contiguous per slice.
+    """
+    names = sorted({k for keys in keys_per_doc for k in keys})
+    group_ids = {k: i for i, k in enumerate(names)}
+    rows, cols = [], []
+    for doc, keys in enumerate(keys_per_doc):
+        for k in set(keys):
+            rows.append(group_ids[k])
+            cols.append(doc)
+
+    G = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(names), n_docs))
+    sizes = np.asarray(G.sum(axis=1)).ravel()
+    return names, diags(1.0 / np.maximum(sizes, 1)) @ G, sizes.astype(int)
+
+
+def _doc_groups(labels, base_topics=False, topic_fn=None):
+    if topic_fn is None and base_topics:
+        topic_fn = split_base_topics
+    if topic_fn is None:
+        return [[str(label).strip()] for label in labels]
+    return [topic_fn(label) for label in labels]
+
+
+def similarity(centroids, method='cosine'):
+    """Pairwise similarity of the rows of a sparse centroid matrix, as a dense (groups x groups) array.
+
+    Pearson correlation is expanded into sums and dot products so the
+    centroids never need to be centered (which would densify them).
+    """
+    if centroids.shape[0] == 0:
+        if method not in ('cosine', 'pearson'):
+            raise ValueError(f"Unknown similarity method: {method}")
+        return np.zeros((0, 0))
+
+    if method == 'cosine':
+        C = normalize(centroids, norm='l2')
+        return np.asarray((C @ C.T).toarray())
+
+    if method == 'pearson':
+        n_features = centroids.shape[1]
+        sums = np.asarray(centroids.sum(axis=1)).ravel()
+        sq_sums = np.asarray(centroids.multiply(centroids).sum(axis=1)).ravel()
+        cov = np.asarray((centroids @ centroids.T).toarray()) - np.outer(sums, sums) / n_features
+        var = sq_sums - sums ** 2 / n_features
+        denom = np.sqrt(np.outer(var, var))
+        return np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 0)
+
+    raise ValueError(f"Unknown similarity method: {method}")
+
+
+def correlate(tfidf_matrix, labels, method='cosine', base_topics=False, topic_fn=None):
+    """Similarity between per-label (or per-base-topic) TF-IDF centroids.
+
+    Args:
+        tfidf_matrix: sparse (docs x features) matrix, e.g. the CHI-TFIDF output.
+        labels: one label per document.
+        method: 'cosine' or 'pearson'.
+        base_topics: split composite labels into base topics on whitespace; a
+            document then counts towards every topic in its label.
+        topic_fn: custom label -> list of groups mapping (overrides base_topics),
+            e.g. ``topic_map_fn(...)`` for compound labels.
+
+    Returns:
+        Square DataFrame indexed by group name; empty if no document maps to a group.
+    """
+    groups = _doc_groups(labels, base_topics, topic_fn)
+    names, G, _ = _group_matrix(groups, tfidf_matrix.shape[0])
+    if not names:
+        return pd.DataFrame()
+    centroids = (G @ tfidf_matrix).tocsr()
+    return pd.DataFrame(similarity(centroids, method), index=names, columns=names)
+
+
+def correlate_by_slice(tfidf_matrix, labels, dates, freq='M', method='cosine', base_topics=False, topic_fn=None):
+    """Centroid similarity computed separately within each time slice.
+
+    All (slice, group) centroids come from one sparse product; similarities
+    are then computed per slice. Documents without a valid date are skipped.
+
+    Args:
+        dates: one date string per document.
+        freq: pandas period alias for the slices ('D', 'W', 'M', 'Y', ...).
+
+    Returns:
+        Long DataFrame with columns slice, group_a, group_b, similarity,
+        n_docs_a, n_docs_b; one row per unordered pair of groups within a slice.
+    """
+    periods = pd.to_datetime(pd.Series(dates), errors='coerce').dt.to_period(freq)
+    slices = [None if pd.isna(p) else str(p) for p in periods]
+    groups = _doc_groups(labels, base_topics, topic_fn)
+    keys = [[(s, g) for g in doc_groups] if s is not None else [] for s, doc_groups in zip(slices, groups)]
+
+    names, G, sizes = _group_matrix(keys, tfidf_matrix.shape[0])
+    centroids = (G @ tfidf_matrix).tocsr()
+
+    names_arr = np.array([g for _, g in names], dtype=object)
+    parts = []
+    lo = 0
+    while lo < len(names):
+        slice_key = names[lo][0]
+        hi = lo
+        while hi < len(names) and names[hi][0] == slice_key:
+            hi += 1
+        if hi - lo > 1:
+            sim = similarity(centroids[lo:hi], method)
+            a, b = np.triu_indices(hi - lo, k=1)
+            parts.append(pd.DataFrame({
+                'slice': slice_key,
+                'group_a': names_arr[lo + a],
+                'group_b': names_arr[lo + b],
+                'similarity': sim[a, b],
+                'n_docs_a': sizes[lo + a],
+                'n_docs_b': sizes[lo + b],
+            }))
+        lo = hi
+
+    if not parts:
+        return pd.DataFrame(columns=['slice', 'group_a', 'group_b', 'similarity', 'n_docs_a', 'n_docs_b'])
+    return pd.concat(parts, ignore_index=True)
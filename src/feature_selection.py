@@ -1,72 +1,98 @@
+from itertools import product
 from sklearn.feature_selection import chi2
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from scipy.sparse import diags
 import pandas as pd
 import numpy as np
 
 class FeatureSelector:
-    def __init__(self, top_k: int = 1000, min_freq: int = 5, min_tfidf: float = 0.01):
+    def __init__(self, top_k: int = 1000, min_freq: int = 5, min_tfidf: float = 0.01, memory_budget=None):
         """Initialize the selector.
 
         Args:
             top_k: Number of top features to keep after chi2 selection.
             min_freq: Minimum document frequency a term must have to be considered.
             min_tfidf: Minimum average TF-IDF score a feature must have to be kept.
+            memory_budget: Optional MemoryBudget; enables compact dtypes and spilling.
         """
         self.top_k = top_k
         self.min_freq = min_freq
         self.min_tfidf = min_tfidf
+        self.memory_budget = memory_budget
+        self.count_dtype = memory_budget.count_dtype if memory_budget else np.int64
+        self.float_dtype = memory_budget.float_dtype if memory_budget else np.float64
         self.selected_features = None
-        self.vectorizer = None  # Final TF‑IDF vectorizer
+        # Fitted TF-IDF state needed to reproduce the output on new documents:
+        # chi2-selected terms, their IDF, and the columns kept by the min_tfidf filter.
+        self.chi2_features = None
+        self.idf_ = None
+        self.output_index = None
+        self._stats = None  # Corpus statistics cached by ``precompute`` for sweeps
 
-    def _filter_low_freq(self, count_vec: CountVectorizer, X_counts):
-        """Remove terms whose document frequency is below ``min_freq``.
-
-        Parameters
-        ----------
-        count_vec: CountVectorizer instance used to generate ``X_counts``.
-        X_counts: sparse matrix of shape (n_samples, n_features).
-        """
-        # Document frequency = number of non‑zero rows per column
-        doc_freq = np.asarray((X_counts > 0).sum(axis=0)).ravel()
-        mask = doc_freq >= self.min_freq
+    @staticmethod
+    def _freq_mask(doc_freq, min_freq):
+        mask = doc_freq >= min_freq
         if not mask.any():
             # If nothing passes the filter, keep all to avoid empty matrix
             mask = np.ones_like(doc_freq, dtype=bool)
-        # Reduce the matrix and feature names
-        X_filtered = X_counts[:, mask]
-        filtered_feature_names = np.array(count_vec.get_feature_names_out())[mask]
-        return X_filtered, filtered_feature_names
+        return mask
 
-    def chi_tfidf(self, texts, labels):
+    def chi_tfidf(self, texts, labels, X_counts=None, count_vec=None):
         """Perform CHI‑square feature selection followed by TF‑IDF weighting.
 
         This method now filters out low‑frequency terms before applying chi2,
-        and optionally filters low TF-IDF weight terms after.
+        and optionally filters low TF-IDF weight terms after. Pass the BoW
+        ``X_counts`` and its fitted ``count_vec`` to reuse them instead of
+        vectorizing the corpus again; TF-IDF is derived from the counts either way.
         """
+        if (X_counts is None) != (count_vec is None):
+            raise ValueError("Pass X_counts and its fitted count_vec together, or neither.")
+
         # 1. Count Vectorization (Bag of Words)
-        count_vec = CountVectorizer()
-        try:
-            X_counts = count_vec.fit_transform(texts)
-        except ValueError:
-            # Handle empty input
-            return None, None
+        if X_counts is None:
+            count_vec = CountVectorizer(dtype=self.count_dtype)
+            try:
+                X_counts = count_vec.fit_transform(texts)
+            except ValueError:
+                # Handle empty input
+                return None, None
+            if self.memory_budget:
+                self.memory_budget.spill_sparse(X_counts, "selector_counts")
+        X_counts = X_counts.tocsr()
+        n_docs, n_terms = X_counts.shape
 
         # 2. Filter low‑frequency terms
-        X_counts, feature_names = self._filter_low_freq(count_vec, X_counts)
+        # Document frequency = number of non‑zero entries per column (CountVectorizer
+        # stores no explicit zeros), counted without building a boolean copy
+        doc_freq = np.bincount(X_counts.indices, minlength=n_terms)
+        freq_idx = np.flatnonzero(self._freq_mask(doc_freq, self.min_freq))
+        feature_names = np.array(count_vec.get_feature_names_out())[freq_idx]
         print(f"[{self.__class__.__name__}] Filtered low-frequency terms: {len(feature_names)} features remaining (min_freq={self.min_freq})")
 
         # 3. Compute Chi2 scores
+        # chi2 scores each column independently, so scoring the full matrix and keeping
+        # the frequent columns equals scoring a filtered copy, without making one.
+        # float32/float64 input is used as is; integer counts are converted by sklearn.
         chi2_stats, _ = chi2(X_counts, labels)
+        chi2_stats = chi2_stats[freq_idx]
 
         # 4. Select top k features by Chi2
         k = min(self.top_k, len(feature_names))
         top_k_indices = np.argsort(chi2_stats)[-k:]
         self.selected_features = feature_names[top_k_indices]
+        cols = freq_idx[top_k_indices]
         print(f"Selected {len(self.selected_features)} features via Chi‑Square (min_freq={self.min_freq}).")
 
         # 5. TF‑IDF on selected features
-        self.vectorizer = TfidfVectorizer(vocabulary=self.selected_features)
-        tfidf_matrix = self.vectorizer.fit_transform(texts)
+        # Same weighting as TfidfVectorizer's defaults (smoothed IDF, l2 rows), computed
+        # from the selected count columns instead of re-tokenizing the corpus
+        idf = np.log((1 + n_docs) / (1 + doc_freq[cols])) + 1
+        weighted = (X_counts[:, cols] @ diags(idf.astype(self.float_dtype))).astype(self.float_dtype, copy=False)
+        tfidf_matrix = normalize(weighted, norm='l2', copy=False)
+        self.chi2_features = self.selected_features
+        self.idf_ = idf
+        self.output_index = np.arange(len(self.selected_features))
         
         # 6. Filter by TF-IDF Threshold (if set)
         if self.min_tfidf is not None and self.min_tfidf > 0:
@@ -88,6 +114,7 @@ class FeatureSelector:
             
             if mask.sum() > 0:
                 self.selected_features = self.selected_features[mask]
+                self.output_index = np.flatnonzero(mask)
                 tfidf_matrix = tfidf_matrix[:, mask]
                 print(f"[{self.__class__.__name__}] Filtered by Min Mean TF-IDF ({self.min_tfidf}): {len(self.selected_features)} features remaining.")
             else:
@@ -97,3 +124,142 @@ class FeatureSelector:
 
     def get_feature_names(self):
         return self.selected_features
+
+    def precompute(self, texts, labels, X_counts=None, count_vec=None):
+        """Compute the statistics shared by every (top_k, min_freq, min_tfidf) setting.
+
+        Document frequencies, chi2 scores and the un-normalized TF-IDF weights are
+        computed once over the full vocabulary. chi2 is scored per column, so scores
+        on the full matrix equal those on any min_freq-filtered subset, and the
+        TF-IDF of a selection only differs by the per-row l2 normalization.
+        As in ``chi_tfidf``, ``X_counts`` and its fitted ``count_vec`` may be passed
+        to reuse an existing vocabulary.
+
+        Returns:
+            True if the statistics were computed, False on an empty vocabulary.
+        """
+        if (X_counts is None) != (count_vec is None):
+            raise ValueError("Pass X_counts and its fitted count_vec together, or neither.")
+
+        if X_counts is None:
+            count_vec = CountVectorizer(dtype=self.count_dtype)
+            try:
+                X_counts = count_vec.fit_transform(texts)
+            except ValueError:
+                self._stats = None
+                return False
+        X_counts = X_counts.tocsr()
+
+        if self.memory_budget:
+            self.memory_budget.spill_sparse(X_counts, "sweep_counts")
+
+        n_docs, n_terms = X_counts.shape
+        doc_freq = np.bincount(X_counts.indices, minlength=n_terms)
+        chi2_stats, _ = chi2(X_counts, labels)
+        # Same smoothed IDF as TfidfVectorizer's defaults
+        idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+        # CSC so that per-setting column selection is cheap
+        weighted = (X_counts @ diags(idf.astype(self.float_dtype))).astype(self.float_dtype, copy=False).tocsc()
+        del X_counts
+        if self.memory_budget:
+            self.memory_budget.spill_sparse(weighted, "sweep_weighted")
+
+        self._stats = {
+            'feature_names': np.array(count_vec.get_feature_names_out()),
+            'doc_freq': doc_freq,
+            'chi2': chi2_stats,
+            'idf': idf,
+            'weighted': weighted,
+        }
+        return True
+
+    def _select_cached(self, top_k, min_freq, min_tfidf):
+        """Re-mask the cached statistics for one setting.
+
+        Mirrors ``chi_tfidf`` step by step, including its fallbacks.
+        Returns (tfidf_matrix, chi2_cols, keep, n_after_freq), where ``chi2_cols``
+        index the full vocabulary and ``keep`` indexes ``chi2_cols``.
+        """
+        stats = self._stats
+        freq_idx = np.flatnonzero(self._freq_mask(stats['doc_freq'], min_freq))
+
+        k = min(top_k, len(freq_idx))
+        chi2_order = np.argsort(stats['chi2'][freq_idx])[-k:]
+        chi2_cols = freq_idx[chi2_order]
+        keep = np.arange(len(chi2_cols))
+
+        tfidf_matrix = normalize(stats['weighted'][:, chi2_cols].tocsr(), norm='l2', copy=False)
+
+        if min_tfidf is not None and min_tfidf > 0:
+            feature_means = np.asarray(tfidf_matrix.mean(axis=0)).ravel()
+            mask = feature_means >= min_tfidf
+            if mask.sum() > 0:
+                keep = np.flatnonzero(mask)
+                tfidf_matrix = tfidf_matrix[:, mask]
+
+        return tfidf_matrix, chi2_cols, keep, len(freq_idx)
+
+    def sweep(self, texts=None, labels=None, top_k_values=None, min_freq_values=None, min_tfidf_values=None):
+        """Evaluate a grid of selection settings from one set of corpus statistics.
+
+        Passing ``texts``/``labels`` (re)computes the statistics; omitting them reuses
+        those from the previous ``precompute`` or ``sweep`` call. Missing grids default
+        to the selector's own value. ``overlap`` is the Jaccard similarity of each
+        setting's features with those of the selector's current setting.
+
+        Returns:
+            DataFrame with one row per setting, or None on an empty vocabulary.
+        """
+        if texts is not None:
+            if not self.precompute(texts, labels):
+                return None
+        elif self._stats is None:
+            raise RuntimeError("No cached statistics; pass texts and labels or call precompute() first.")
+
+        top_k_values = top_k_values or [self.top_k]
+        min_freq_values = min_freq_values or [self.min_freq]
+        min_tfidf_values = min_tfidf_values or [self.min_tfidf]
+
+        names = self._stats['feature_names']
+        _, base_cols, base_keep, _ = self._select_cached(self.top_k, self.min_freq, self.min_tfidf)
+        base_set = set(names[base_cols[base_keep]])
+
+        rows = []
+        for top_k, min_freq, min_tfidf in product(top_k_values, min_freq_values, min_tfidf_values):
+            _, chi2_cols, keep, n_freq = self._select_cached(top_k, min_freq, min_tfidf)
+            feature_set = set(names[chi2_cols[keep]])
+            union = feature_set | base_set
+            rows.append({
+                'top_k': top_k,
+                'min_freq': min_freq,
+                'min_tfidf': min_tfidf,
+                'n_after_freq': n_freq,
+                'n_after_chi2': len(chi2_cols),
+                'n_features': len(keep),
+                'overlap': len(feature_set & base_set) / len(union) if union else 1.0,
+            })
+
+        report = pd.DataFrame(rows)
+        print(f"[{self.__class__.__name__}] Evaluated {len(report)} settings over {len(self._stats['feature_names'])} terms.")
+        return report
+
+    def use_setting(self, top_k, min_freq, min_tfidf):
+        """Adopt one swept setting and return its (tfidf_matrix, selected_features).
+
+        Must be called after ``precompute`` or ``sweep``; the result matches what
+        ``chi_tfidf`` would return for the same texts and parameters.
+        """
+        if self._stats is None:
+            raise RuntimeError("No cached statistics; call precompute() or sweep() first.")
+
+        self.top_k = top_k
+        self.min_freq = min_freq
+        self.min_tfidf = min_tfidf
+        tfidf_matrix, chi2_cols, keep, _ = self._select_cached(top_k, min_freq, min_tfidf)
+        self.chi2_features = self._stats['feature_names'][chi2_cols]
+        self.idf_ = self._stats['idf'][chi2_cols]
+        self.output_index = keep
+        self.selected_features = self.chi2_features[keep]
+        print(f"[{self.__class__.__name__}] Using top_k={top_k}, min_freq={min_freq}, min_tfidf={min_tfidf}: {len(self.selected_features)} features.")
+        return tfidf_matrix, self.selected_features
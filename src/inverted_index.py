@@ -0,0 +1,161 @@
+import bisect
+from functools import reduce
+import numpy as np
+
+
+class InvertedIndex:
+    """Inverted index over a BoW matrix with label and date bitmaps.
+
+    Doc ids are row positions in the ``*_processed.csv`` / ``*_bow.csv`` files.
+    Postings are stored CSC-style: for term ``t`` the doc ids live in
+    ``doc_gaps[indptr[t]:indptr[t + 1]]`` as gaps from the previous id (the
+    first entry is absolute), which keeps values small for compression on
+    disk. Labels and days (``YYYY-MM-DD``) each get a packed doc-id bitmap;
+    day rows are sorted so that a date range is a contiguous slice.
+    """
+
+    def __init__(self, terms, indptr, doc_gaps, counts, n_docs,
+                 label_names, label_bitmaps, day_names, day_bitmaps):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_gaps = doc_gaps
+        self.counts = counts
+        self.n_docs = n_docs
+        self.label_names = list(label_names)
+        self.label_ids = {label: i for i, label in enumerate(self.label_names)}
+        self.label_bitmaps = label_bitmaps
+        self.day_names = list(day_names)
+        self.day_bitmaps = day_bitmaps
+
+    @staticmethod
+    def _bitmaps(keys, n_docs):
+        """Return (sorted distinct keys, packed bitmap per key); None keys are skipped."""
+        names = sorted({k for k in keys if k is not None})
+        key_ids = {k: i for i, k in enumerate(names)}
+        rows = np.array([key_ids.get(k, -1) for k in keys], dtype=np.int64)
+        docs = np.flatnonzero(rows >= 0)
+
+        # Set bits byte-wise in np.packbits layout (big-endian within each byte)
+        bitmaps = np.zeros((len(names), (n_docs + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(bitmaps, (rows[docs], docs >> 3), (128 >> (docs & 7)).astype(np.uint8))
+        return names, bitmaps
+
+    @classmethod
+    def build(cls, X_counts, vocabulary, labels, dates):
+        """Build the index from a (docs x terms) count matrix.
+
+        Args:
+            X_counts: sparse BoW matrix whose columns follow ``vocabulary``.
+            vocabulary: dict {word: column}, e.g. ``CountVectorizer.vocabulary_``.
+            labels: one label per document.
+            dates: one ``YYYY-MM-DD HH:MM:SS`` string (or None) per document.
+        """
+        n_docs = X_counts.shape[0]
+        terms = [word for word, _ in sorted(vocabulary.items(), key=lambda item: item[1])]
+
+        X_csc = X_counts.tocsc()
+        X_csc.sort_indices()
+        doc_ids = X_csc.indices.astype(np.uint32)
+        doc_gaps = np.diff(doc_ids, prepend=np.uint32(0)).astype(np.uint32)
+        # The first posting of each term is stored as an absolute id
+        starts = X_csc.indptr[:-1][np.diff(X_csc.indptr) > 0]
+        doc_gaps[starts] = doc_ids[starts]
+
+        label_names, label_bitmaps = cls._bitmaps(list(labels), n_docs)
+        days = [str(d)[:10] if isinstance(d, str) and d else None for d in dates]
+        day_names, day_bitmaps = cls._bitmaps(days, n_docs)
+
+        return cls(terms, X_csc.indptr.astype(np.int64), doc_gaps, X_csc.data.astype(np.uint32),
+                   n_docs, label_names, label_bitmaps, day_names, day_bitmaps)
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            terms=np.array(self.terms, dtype=str),
+            indptr=self.indptr,
+            doc_gaps=self.doc_gaps,
+            counts=self.counts,
+            n_docs=np.array(self.n_docs),
+            label_names=np.array(self.label_names, dtype=str),
+            label_bitmaps=self.label_bitmaps,
+            day_names=np.array(self.day_names, dtype=str),
+            day_bitmaps=self.day_bitmaps,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['terms'].tolist(),
+                data['indptr'],
+                data['doc_gaps'],
+                data['counts'],
+                int(data['n_docs']),
+                data['label_names'].tolist(),
+                data['label_bitmaps'],
+                data['day_names'].tolist(),
+                data['day_bitmaps'],
+            )
+
+    def postings(self, term):
+        """Return (sorted doc ids, counts) of documents containing ``term``."""
+        term_id = self.term_ids.get(term.lower())
+        if term_id is None:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+        lo, hi = self.indptr[term_id], self.indptr[term_id + 1]
+        return np.cumsum(self.doc_gaps[lo:hi], dtype=np.uint32), self.counts[lo:hi]
+
+    def _empty_bitmap(self):
+        return np.zeros((self.n_docs + 7) // 8, dtype=np.uint8)
+
+    def _filter_bitmap(self, label=None, start=None, end=None):
+        """AND of the label bitmap and the OR of day bitmaps in [start, end], or None."""
+        bitmap = None
+        if label is not None:
+            label_id = self.label_ids.get(label)
+            if label_id is None:
+                return self._empty_bitmap()
+            bitmap = self.label_bitmaps[label_id]
+
+        if start is not None or end is not None:
+            lo = bisect.bisect_left(self.day_names, str(start)[:10]) if start is not None else 0
+            hi = bisect.bisect_right(self.day_names, str(end)[:10]) if end is not None else len(self.day_names)
+            if lo < hi:
+                day_bitmap = np.bitwise_or.reduce(self.day_bitmaps[lo:hi], axis=0)
+            else:
+                day_bitmap = self._empty_bitmap()
+            bitmap = day_bitmap if bitmap is None else bitmap & day_bitmap
+
+        return bitmap
+
+    def query(self, terms=None, label=None, start=None, end=None):
+        """Return sorted ids of documents matching every given condition.
+
+        Args:
+            terms: word or list of words that must all occur in the document.
+            label: exact label the document must carry.
+            start, end: inclusive date bounds, as ``YYYY-MM-DD`` or longer strings.
+        """
+        if isinstance(terms, str):
+            terms = [terms]
+        bitmap = self._filter_bitmap(label, start, end)
+
+        if not terms:
+            if bitmap is None:
+                return np.arange(self.n_docs, dtype=np.uint32)
+            return np.flatnonzero(np.unpackbits(bitmap, count=self.n_docs)).astype(np.uint32)
+
+        # Intersect from the shortest posting list up
+        doc_lists = sorted((self.postings(term)[0] for term in terms), key=len)
+        docs = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), doc_lists)
+
+        if bitmap is not None and len(docs):
+            # Test each candidate's bit directly (packbits uses big-endian bit order)
+            hit = (bitmap[docs >> 3] >> (7 - (docs & 7)).astype(np.uint8)) & 1
+            docs = docs[hit.astype(bool)]
+        return docs
+
+    def doc_freq(self, terms=None, label=None, start=None, end=None):
+        """Number of documents matching ``query`` with the same arguments."""
+        return len(self.query(terms, label, start, end))
@@ -0,0 +1,117 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryBudget:
+    """Memory budget for the mining pipeline.
+
+    With a budget set, stages use compact dtypes (float32 counts and TF-IDF;
+    sparse indices stay int32, the smallest index type scipy accepts),
+    intermediates larger than ``spill_fraction`` of the budget are moved to
+    memory-mapped temporary files, and dense output is produced in row
+    chunks that fit the budget. Current and peak-so-far RSS are recorded at
+    each checkpoint so a run can be checked against the budget afterwards.
+    """
+
+    def __init__(self, budget_mb, spill_dir=None, spill_fraction=0.25):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self.spill_fraction = spill_fraction
+        # Counts are stored as float32 rather than int32: exact up to 2**24, and
+        # chi2 accepts float32 as is instead of making a float64 copy
+        self.count_dtype = np.float32
+        self.float_dtype = np.float32
+        self.checkpoints = []  # (stage, current_bytes, peak_bytes)
+        self._tmp_dir = None
+        self._n_spilled = 0
+
+    @property
+    def spill_threshold(self):
+        return int(self.budget_bytes * self.spill_fraction)
+
+    @staticmethod
+    def current_rss():
+        """Current resident set size of this process in bytes, or None if unavailable (non-Linux)."""
+        try:
+            with open('/proc/self/statm') as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+    @staticmethod
+    def peak_rss():
+        """Highest resident set size since the process started, in bytes, or None if unavailable."""
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def checkpoint(self, stage):
+        self.checkpoints.append((stage, self.current_rss(), self.peak_rss()))
+
+    def _memmap_copy(self, array, name):
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="datahandler_spill_", dir=self.spill_dir)
+        path = os.path.join(self._tmp_dir, f"{name}.dat")
+        mm = np.memmap(path, dtype=array.dtype, mode='w+', shape=array.shape)
+        mm[:] = array
+        mm.flush()
+        return mm
+
+    def spill_sparse(self, matrix, name):
+        """Move a CSR/CSC matrix's arrays to memory-mapped files, in place, if it is over the spill threshold.
+
+        The arrays are swapped one at a time, so each in-RAM copy is freed as soon
+        as its file copy is flushed; spilling needs one extra array, not a second
+        matrix. Flushed pages are file-backed and can be dropped by the OS under
+        memory pressure. The caller must not hold other references to the old arrays.
+        """
+        nbytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        if nbytes <= self.spill_threshold:
+            return matrix
+
+        self._n_spilled += 1
+        name = f"{self._n_spilled:03d}_{name}"
+        for attr in ('data', 'indices', 'indptr'):
+            setattr(matrix, attr, self._memmap_copy(getattr(matrix, attr), f"{name}_{attr}"))
+        print(f"[MemoryBudget] Spilled {name} ({nbytes / 1024 / 1024:.1f} MB) to {self._tmp_dir}")
+        return matrix
+
+    def dense_chunk_rows(self, n_cols, itemsize):
+        """Rows per chunk so that a densified chunk (plus its CSV formatting) stays under the spill threshold."""
+        # DataFrame construction and text formatting roughly quadruple the raw block
+        row_bytes = max(1, n_cols * itemsize * 4)
+        return max(1, self.spill_threshold // row_bytes)
+
+    def report(self):
+        mb = 1024 * 1024
+        print(f"--- Memory Report (budget {self.budget_bytes / mb:.0f} MB) ---")
+        # "current" is sampled at the end of the stage; "peak so far" is the
+        # process-wide high-water mark and never decreases between rows. A stage is
+        # flagged if it ends over budget or if the high-water mark crossed the
+        # budget while it ran.
+        previous_peak = 0
+        for stage, current, peak in self.checkpoints:
+            current_str = f"{current / mb:8.1f} MB" if current is not None else "     n/a   "
+            peak_str = f"{peak / mb:8.1f} MB" if peak is not None else "     n/a   "
+            over = (current is not None and current > self.budget_bytes) or \
+                (peak is not None and peak > self.budget_bytes and peak > previous_peak)
+            flag = "OVER" if over else ("n/a" if current is None and peak is None else "ok")
+            print(f"{stage:<40} | current {current_str} | peak so far {peak_str} | {flag}")
+            if peak is not None:
+                previous_peak = peak
+
+    def cleanup(self):
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
@@ -0,0 +1,210 @@
+import os
+import json
+import numpy as np
+from scipy.sparse import diags
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+# File layout of a saved bundle directory
+DICTIONARY_FILE = "dictionary.txt"     # "word id" per line, same format as *_dictionary.txt
+FEATURES_FILE = "features.txt"         # output CHI-TFIDF column names, one per line
+CHI2_INDEX_FILE = "chi2_index.npy"     # BoW column of each chi2-selected term
+IDF_FILE = "idf.npy"                   # IDF of each chi2-selected term
+OUTPUT_INDEX_FILE = "output_index.npy" # chi2 terms kept after the min_tfidf filter
+STOPWORDS_FILE = "stopwords.txt"
+BIGRAM_FILE = "bigram.pkl"
+META_FILE = "meta.json"
+
+
+class ModelBundle:
+    """Fitted vocabulary, CHI-TFIDF weights and preprocessing for one language.
+
+    A bundle reproduces the batch pipeline's ``text_processed``, BoW and
+    CHI-TFIDF outputs for new raw documents. Numeric arrays are stored as
+    ``.npy`` files and memory-mapped on load, so loading stays fast and
+    several processes can share the same pages.
+    """
+
+    def __init__(self, lang, vocabulary, features, chi2_index, idf, output_index,
+                 stopwords=None, bigram=None, meta=None):
+        self.lang = lang
+        self.vocabulary = vocabulary  # list of words, position == BoW column
+        self.features = features
+        self.chi2_index = chi2_index
+        self.idf = idf
+        self.output_index = output_index
+        self.stopwords = stopwords or set()
+        self.bigram = bigram
+        self.meta = meta or {}
+        self._count_vec = None
+        self._preprocessor = None
+
+    @classmethod
+    def from_fitted(cls, lang, preprocessor, count_vec, selector):
+        """Build a bundle from a fitted CountVectorizer and FeatureSelector."""
+        vocab = count_vec.vocabulary_
+        vocabulary = [word for word, _ in sorted(vocab.items(), key=lambda item: item[1])]
+        chi2_index = np.array([vocab[word] for word in selector.chi2_features], dtype=np.int32)
+        meta = {
+            'lang': lang,
+            'n_vocabulary': len(vocabulary),
+            'n_features': len(selector.selected_features),
+            'top_k': selector.top_k,
+            'min_freq': selector.min_freq,
+            'min_tfidf': selector.min_tfidf,
+        }
+        return cls(
+            lang,
+            vocabulary,
+            list(selector.selected_features),
+            chi2_index,
+            np.asarray(selector.idf_, dtype=np.float64),
+            np.asarray(selector.output_index, dtype=np.int32),
+            stopwords=preprocessor.stopwords,
+            bigram=preprocessor.bigram if lang == 'en' else None,
+            meta=meta,
+        )
+
+    def save(self, bundle_dir):
+        if not os.path.exists(bundle_dir):
+            os.makedirs(bundle_dir)
+
+        with open(os.path.join(bundle_dir, DICTIONARY_FILE), 'w', encoding='utf-8') as f:
+            for idx, word in enumerate(self.vocabulary):
+                f.write(f"{word} {idx}\n")
+        with open(os.path.join(bundle_dir, FEATURES_FILE), 'w', encoding='utf-8') as f:
+            for word in self.features:
+                f.write(f"{word}\n")
+        with open(os.path.join(bundle_dir, STOPWORDS_FILE), 'w', encoding='utf-8') as f:
+            for word in sorted(self.stopwords):
+                f.write(f"{word}\n")
+
+        np.save(os.path.join(bundle_dir, CHI2_INDEX_FILE), self.chi2_index)
+        np.save(os.path.join(bundle_dir, IDF_FILE), self.idf)
+        np.save(os.path.join(bundle_dir, OUTPUT_INDEX_FILE), self.output_index)
+
+        if self.bigram is not None:
+            self.bigram.save(os.path.join(bundle_dir, BIGRAM_FILE))
+
+        with open(os.path.join(bundle_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, bundle_dir, mmap=True):
+        mmap_mode = 'r' if mmap else None
+
+        with open(os.path.join(bundle_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(bundle_dir, DICTIONARY_FILE), 'r', encoding='utf-8') as f:
+            vocabulary = [line.rstrip('\n').rsplit(' ', 1)[0] for line in f]
+        with open(os.path.join(bundle_dir, FEATURES_FILE), 'r', encoding='utf-8') as f:
+            features = [line.rstrip('\n') for line in f]
+        with open(os.path.join(bundle_dir, STOPWORDS_FILE), 'r', encoding='utf-8') as f:
+            stopwords = {line.rstrip('\n') for line in f if line.strip()}
+
+        bigram = None
+        bigram_path = os.path.join(bundle_dir, BIGRAM_FILE)
+        if os.path.exists(bigram_path):
+            from gensim.models.phrases import Phraser
+            bigram = Phraser.load(bigram_path)
+
+        return cls(
+            meta['lang'],
+            vocabulary,
+            features,
+            np.load(os.path.join(bundle_dir, CHI2_INDEX_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(bundle_dir, IDF_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(bundle_dir, OUTPUT_INDEX_FILE), mmap_mode=mmap_mode),
+            stopwords=stopwords,
+            bigram=bigram,
+            meta=meta,
+        )
+
+    def _get_preprocessor(self):
+        if self._preprocessor is None:
+            from src.preprocessor import DataPreprocessor
+            self._preprocessor = DataPreprocessor(self.stopwords, memoize=False)
+            self._preprocessor.bigram = self.bigram
+        return self._preprocessor
+
+    def _get_count_vec(self):
+        if self._count_vec is None:
+            # A fixed vocabulary needs no fitting; tokenization matches the batch run
+            self._count_vec = CountVectorizer(vocabulary=self.vocabulary)
+        return self._count_vec
+
+    def transform(self, raw_texts):
+        """Vectorize raw documents.
+
+        Returns:
+            (processed_texts, bow_matrix, tfidf_matrix) where ``bow_matrix`` uses the
+            dictionary's ids and ``tfidf_matrix`` has one column per ``features`` entry.
+        """
+        preprocessor = self._get_preprocessor()
+        processed = [preprocessor.process_document(text, self.lang) for text in raw_texts]
+
+        bow = self._get_count_vec().transform(processed)
+        # Same steps as TfidfVectorizer on the chi2 vocabulary, then the min_tfidf mask
+        weighted = bow[:, self.chi2_index] @ diags(np.asarray(self.idf))
+        tfidf = normalize(weighted, norm='l2', copy=False)[:, self.output_index]
+        return processed, bow, tfidf
+
+    def transform_batches(self, raw_texts, batch_size=64):
+        """Yield ``transform`` results for successive micro-batches of an iterable."""
+        batch = []
+        for text in raw_texts:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                yield self.transform(batch)
+                batch = []
+        if batch:
+            yield self.transform(batch)
+
+
+def serve(bundle_dir, host="127.0.0.1", port=8765):
+    """Minimal local scoring service.
+
+    POST a JSON body ``{"texts": [...]}`` to any path and receive, per document,
+    the processed text, its BoW as {id: count} and its non-zero CHI-TFIDF
+    weights as {feature: weight}.
+    """
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    bundle = ModelBundle.load(bundle_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                texts = json.loads(self.rfile.read(length).decode('utf-8'))['texts']
+                processed, bow, tfidf = bundle.transform(texts)
+            except Exception as e:
+                self.send_error(400, str(e))
+                return
+
+            results = []
+            for i, text in enumerate(processed):
+                bow_row = bow.getrow(i)
+                tfidf_row = tfidf.getrow(i)
+                results.append({
+                    'text_processed': text,
+                    'bow': {int(idx): int(count) for idx, count in zip(bow_row.indices, bow_row.data)},
+                    'tfidf': {bundle.features[idx]: float(w) for idx, w in zip(tfidf_row.indices, tfidf_row.data)},
+                })
+            body = json.dumps(results, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    print(f"[{bundle.lang}] Serving model bundle {bundle_dir} on http://{host}:{port}")
+    HTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.model_bundle <bundle_dir> [port]")
+        sys.exit(1)
+    serve(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) > 2 else 8765)
@@ -1,4 +1,6 @@
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import jieba
 import nltk
@@ -9,7 +11,7 @@ from gensim.models import Phrases
 from gensim.models.phrases import Phraser
 
 class DataPreprocessor:
-    def __init__(self, stopwords):
+    def __init__(self, stopwords, memoize=True):
         if stopwords:
             self.stopwords = stopwords
         else:
@@ -28,6 +30,17 @@ class DataPreprocessor:
             'said', 'say', 'year', 'others', 'also', 'us', 'would', 'could', 'told', 'one', 'two',
             'mr', 'ms', 'mrs', 'new', 'report', 'bbc', 'like', 'time', 'people'
         }
+
+        # Reposts repeat the same text across files and topic folders, so
+        # tokenization results are cached by a hash of the cleaned text for the
+        # duration of one ``load_and_clean_data`` call.
+        self.memoize = memoize
+        self._token_cache = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+        # Bigram model fitted on the English corpus, kept for transforming new documents
+        self.bigram = None
         
     def normalize_date(self, date_str):
         try:
@@ -108,69 +121,137 @@ class DataPreprocessor:
         filtered = [w for w in segs if w not in self.stopwords and len(w.strip()) > 0]
         return " ".join(filtered)
 
-    def load_and_clean_data(self, data_dir):
-        en_data = []
-        cn_data = []
-        
-        for root, dirs, files in os.walk(data_dir):
-            for file in files:
-                if not file.endswith('.csv'):
-                    continue
-                
-                file_path = os.path.join(root, file)
+    def process_document(self, text, lang):
+        """Turn one raw document into ``text_processed`` exactly as the batch pipeline does."""
+        if lang == 'en':
+            tokens = self.process_english_tokens(self.clean_text_english(text))
+            if self.bigram is not None:
+                tokens = self.bigram[tokens]
+            return " ".join(tokens)
+        return self.segment_chinese(self.clean_text_chinese(text))
+
+    def _tokenize_memoized(self, texts, clean_fn, tokenize_fn, lang):
+        """Clean every text, but tokenize each distinct cleaned text only once."""
+        results = []
+        for text in texts:
+            cleaned = clean_fn(text)
+            if not self.memoize:
+                results.append(tokenize_fn(cleaned))
+                continue
+            key = (lang, hashlib.blake2b(cleaned.encode('utf-8'), digest_size=16).digest())
+            if key in self._token_cache:
+                self._cache_hits += 1
+            else:
+                self._token_cache[key] = tokenize_fn(cleaned)
+                self._cache_misses += 1
+            results.append(self._token_cache[key])
+        return pd.Series(results, index=texts.index, dtype=object)
+
+    @staticmethod
+    def _read_csvs_prefetched(data_dir):
+        """Yield (root, file, df, error) for every CSV under ``data_dir``, in ``os.walk`` order.
+
+        The next file is read on a background thread while the caller processes
+        the current one.
+        """
+        csv_files = [(root, file) for root, dirs, files in os.walk(data_dir)
+                     for file in files if file.endswith('.csv')]
+        if not csv_files:
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = pool.submit(pd.read_csv, os.path.join(*csv_files[0]))
+            for i, (root, file) in enumerate(csv_files):
+                future = pending
+                if i + 1 < len(csv_files):
+                    pending = pool.submit(pd.read_csv, os.path.join(*csv_files[i + 1]))
                 try:
-                    df = pd.read_csv(file_path)
+                    df = future.result()
                 except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
+                    yield root, file, None, e
                     continue
+                yield root, file, df, None
 
-                content_col = None
-                date_col = None
-                label = None
-
-                folder_name = os.path.basename(root)
-                label = folder_name
-                
-                if folder_name.lower() == 'bbc':
-                    label = os.path.splitext(file)[0]
-
-                if 'content' in df.columns:
-                    content_col = 'content'
-                elif '微博正文' in df.columns:
-                    content_col = '微博正文'
-                
-                if not content_col:
-                    continue
-                
-                if 'date' in df.columns:
-                    date_col = 'date'
-                elif '发布时间' in df.columns:
-                    date_col = '发布时间'
-                
-                temp_df = pd.DataFrame()
-                temp_df['text_raw'] = df[content_col]
-                temp_df['label'] = label
-                
-                if date_col:
-                    temp_df['date'] = df[date_col].apply(self.normalize_date)
-                else:
-                    temp_df['date'] = None
-
-                temp_df.dropna(subset=['text_raw'], inplace=True)
-                
-                is_english = 'bbc' in file_path.lower()
-                
-                if is_english:
-                    # Step 1: Clean & Tokenize
-                    temp_df['tokens'] = temp_df['text_raw'].apply(lambda x: self.process_english_tokens(self.clean_text_english(x)))
-                    # Remove empty
-                    temp_df = temp_df[temp_df['tokens'].apply(len) > 0]
-                    en_data.append(temp_df)
-                else:
-                    temp_df['text_processed'] = temp_df['text_raw'].apply(lambda x: self.segment_chinese(self.clean_text_chinese(x)))
-                    temp_df = temp_df[temp_df['text_processed'].str.strip() != '']
-                    cn_data.append(temp_df)
+    def load_and_clean_data(self, data_dir, multi_label=False):
+        """Load every CSV under ``data_dir`` and return (df_en, df_cn).
+
+        Both frames have ``label``, ``date`` and ``text_processed`` columns; the raw
+        text is dropped once it has been tokenized.
+
+        Duplicate texts are dropped after processing. With ``multi_label=True`` a
+        text is kept once per label it appears under instead of only under the
+        first one.
+        """
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._token_cache.clear()
+
+        en_data = []
+        cn_data = []
+        
+        for root, file, df, error in self._read_csvs_prefetched(data_dir):
+            file_path = os.path.join(root, file)
+            if error is not None:
+                print(f"Error reading {file_path}: {error}")
+                continue
+
+            content_col = None
+            date_col = None
+            label = None
+
+            folder_name = os.path.basename(root)
+            label = folder_name
+            
+            if folder_name.lower() == 'bbc':
+                label = os.path.splitext(file)[0]
+
+            if 'content' in df.columns:
+                content_col = 'content'
+            elif '微博正文' in df.columns:
+                content_col = '微博正文'
+            
+            if not content_col:
+                continue
+            
+            if 'date' in df.columns:
+                date_col = 'date'
+            elif '发布时间' in df.columns:
+                date_col = '发布时间'
+            
+            temp_df = pd.DataFrame()
+            temp_df['text_raw'] = df[content_col]
+            temp_df['label'] = label
+            
+            if date_col:
+                temp_df['date'] = df[date_col].apply(self.normalize_date)
+            else:
+                temp_df['date'] = None
+
+            temp_df.dropna(subset=['text_raw'], inplace=True)
+            
+            is_english = 'bbc' in file_path.lower()
+            
+            if is_english:
+                # Step 1: Clean & Tokenize
+                temp_df['tokens'] = self._tokenize_memoized(
+                    temp_df['text_raw'], self.clean_text_english, self.process_english_tokens, 'en')
+                # Remove empty
+                temp_df = temp_df[temp_df['tokens'].apply(len) > 0]
+                # Nothing reads the raw text after tokenization; don't carry it through the run
+                en_data.append(temp_df.drop(columns=['text_raw']))
+            else:
+                temp_df['text_processed'] = self._tokenize_memoized(
+                    temp_df['text_raw'], self.clean_text_chinese, self.segment_chinese, 'cn')
+                temp_df = temp_df[temp_df['text_processed'].str.strip() != '']
+                cn_data.append(temp_df.drop(columns=['text_raw']))
     
+        if self.memoize:
+            print(f"Tokenization cache: {self._cache_misses} distinct texts processed, {self._cache_hits} duplicates reused.")
+        # The rows hold their own results now; don't keep the cache alive with the preprocessor
+        self._token_cache.clear()
+
+        dedup_subset = ['text_processed', 'label'] if multi_label else ['text_processed']
+
         df_en = pd.concat(en_data, ignore_index=True) if en_data else pd.DataFrame()
         df_cn = pd.concat(cn_data, ignore_index=True) if cn_data else pd.DataFrame()
         
@@ -181,6 +262,7 @@ class DataPreprocessor:
             # Train model
             phrases = Phrases(docs, min_count=2, threshold=2)  # Low threshold to catch many bigrams
             bigram = Phraser(phrases)
+            self.bigram = bigram
             
             # Transform
             print("Applying Bigrams...")
@@ -188,9 +270,9 @@ class DataPreprocessor:
             df_en.drop(columns=['tokens'], inplace=True)
             
             # Deduplicate strictly on the final text
-            df_en.drop_duplicates(subset=['text_processed'], inplace=True)
+            df_en.drop_duplicates(subset=dedup_subset, inplace=True)
         
         if not df_cn.empty:
-            df_cn.drop_duplicates(subset=['text_processed'], inplace=True)
+            df_cn.drop_duplicates(subset=dedup_subset, inplace=True)
             
         return df_en, df_cn
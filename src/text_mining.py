@@ -1,12 +1,37 @@
+import hashlib
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.feature_selection import chi2
+from src.async_writer import run_write
 
 class TextMiner:
-    def __init__(self, output_dir, lang_prefix):
+    def __init__(self, output_dir, lang_prefix, build_index=False, memory_budget=None,
+                 correlation=False, correlation_method='cosine', correlation_slice=None,
+                 topic_map=None, writer=None):
         self.output_dir = output_dir
         self.prefix = lang_prefix
+        # Also write {prefix}_index.npz for term/label/date queries (see InvertedIndex)
+        self.build_index = build_index
+        # Optional MemoryBudget: compact dtypes, spilling and chunked dense output
+        self.memory_budget = memory_budget
+        # Label/base-topic centroid similarity on the CHI-TFIDF matrix (see src/correlation.py);
+        # correlation_slice is a pandas period alias ('W', 'M', ...) for per-slice output;
+        # topic_map maps compound labels to their base topics (see topic_map_fn)
+        self.correlation = correlation
+        self.correlation_method = correlation_method
+        self.correlation_slice = correlation_slice
+        self.topic_map = topic_map
+        # Optional BackgroundWriter; outputs are written off the main thread and
+        # the caller must flush() it before reading them back. Under a memory budget
+        # writes stay synchronous: queued jobs would keep whole-corpus frames alive
+        # and the budget checkpoints would run before the writes they measure.
+        self.writer = writer if memory_budget is None else None
+        # Fitted state from the last ``process`` run, used by ``save_model``;
+        # _corpus_key identifies the corpus it was fitted on
+        self.count_vec = None
+        self.selector = None
+        self._corpus_key = None
 
     def process(self, df):
         if df.empty:
@@ -19,27 +44,33 @@ class TextMiner:
 
         # 1. Save Processed Data
         processed_path = f"{self.output_dir}/{self.prefix}_processed.csv"
-        df[['date', 'label', 'text_processed']].to_csv(processed_path, index=False, encoding='utf-8-sig')
-        print(f"[{self.prefix}] Saved processed data to {processed_path}")
+        run_write(self.writer, f"processed data -> {processed_path}", self._write_csv,
+                  df[['date', 'label', 'text_processed']], processed_path, "processed data", index=False)
 
         # 2. Build Dictionary & BoW
         # Use CountVectorizer to build vocab and count matrix
-        count_vec = CountVectorizer()
+        budget = self.memory_budget
+        count_vec = CountVectorizer(dtype=budget.count_dtype) if budget else CountVectorizer()
         try:
             X_counts = count_vec.fit_transform(texts)
         except ValueError:
             print(f"[{self.prefix}] Error in vectorization (empty vocab?).")
             return
+        self.count_vec = count_vec
+        self.selector = None
+        self._corpus_key = self._corpus_fingerprint(texts, labels)
+        if budget:
+            budget.checkpoint(f"[{self.prefix}] vectorize")
+            # Fitting is unavoidably in RAM; moving the counts out before the BoW
+            # strings and feature selection keeps them from adding to those stages
+            budget.spill_sparse(X_counts, f"{self.prefix}_counts")
 
         # Save Dictionary
         vocab = count_vec.vocabulary_  # dict {word: index}
         # Sort by index
         sorted_vocab = sorted(vocab.items(), key=lambda item: item[1])
         dict_path = f"{self.output_dir}/{self.prefix}_dictionary.txt"
-        with open(dict_path, 'w', encoding='utf-8') as f:
-            for word, idx in sorted_vocab:
-                f.write(f"{word} {idx}\n")
-        print(f"[{self.prefix}] Saved dictionary to {dict_path}")
+        run_write(self.writer, f"dictionary -> {dict_path}", self._write_dictionary, sorted_vocab, dict_path)
 
         # Save BoW
         # Format: date, label, vector_string (or dense columns? Sparse is better for text but CSV doesn't support sparse nicely).
@@ -57,14 +88,14 @@ class TextMiner:
         # Im going to output a format: date, label, bow (string "word_id:count ...")
         
         bow_lines = []
-        X_counts_csc = X_counts.tocsc()
-        X_counts_csr = X_counts.tocsr()
+        X_counts = X_counts.tocsr()
+        indptr, indices, data = X_counts.indptr, X_counts.indices, X_counts.data
         
         for i in range(len(texts)):
-             # Get non-zero elements
-            row = X_counts_csr[i]
-            # row.indices, row.data
-            bow_str = " ".join([f"{idx}:{count}" for idx, count in zip(row.indices, row.data)])
+            # Non-zero elements of row i, read straight from the CSR arrays
+            start, end = indptr[i], indptr[i + 1]
+            # Counts may be stored as floats under a memory budget; always write integers
+            bow_str = " ".join([f"{idx}:{count:.0f}" for idx, count in zip(indices[start:end], data[start:end])])
             bow_lines.append(bow_str)
             
         bow_df = pd.DataFrame({
@@ -73,8 +104,19 @@ class TextMiner:
             'bow_vector': bow_lines
         })
         bow_path = f"{self.output_dir}/{self.prefix}_bow.csv"
-        bow_df.to_csv(bow_path, index=False, encoding='utf-8-sig')
-        print(f"[{self.prefix}] Saved BoW to {bow_path}")
+        run_write(self.writer, f"BoW -> {bow_path}", self._write_csv, bow_df, bow_path, "BoW", index=False)
+        del bow_df, bow_lines
+
+        if self.build_index:
+            from src.inverted_index import InvertedIndex
+            index = InvertedIndex.build(X_counts, vocab, labels, dates)
+            index_path = f"{self.output_dir}/{self.prefix}_index.npz"
+            run_write(self.writer, f"inverted index -> {index_path}", self._write_index, index, index_path)
+            del index
+
+        del indptr, indices, data
+        if budget:
+            budget.checkpoint(f"[{self.prefix}] BoW")
 
         # 3. CHI-TFIDF Feature Selection
         from src.feature_selection import FeatureSelector
@@ -82,22 +124,165 @@ class TextMiner:
         # Initialize selector with filters
         # min_freq=5: Remove words appearing in <5 docs
         # min_tfidf=0.01: Lowered threshold to keep more features while filtering absolute noise
-        selector = FeatureSelector(top_k=1000, min_freq=5, min_tfidf=0.01)
+        selector = FeatureSelector(top_k=1000, min_freq=5, min_tfidf=0.01, memory_budget=budget)
         
-        tfidf_matrix, selected_features = selector.chi_tfidf(texts, labels)
+        # Reuse the BoW counts rather than vectorizing the corpus a second time
+        tfidf_matrix, selected_features = selector.chi_tfidf(texts, labels, X_counts=X_counts, count_vec=count_vec)
+        del X_counts
+        if budget:
+            budget.checkpoint(f"[{self.prefix}] CHI-TFIDF")
         
         if tfidf_matrix is None or selected_features is None:
              print(f"[{self.prefix}] Feature selection resulted in empty set.")
              return
+        self.selector = selector
 
-        # Construct TFIDF output
-        dense_tfidf = tfidf_matrix.toarray()
-        
-        # Create DF
-        tfidf_df = pd.DataFrame(dense_tfidf, columns=selected_features)
-        tfidf_df.insert(0, 'label', labels)
-        tfidf_df.insert(0, 'date', dates)
-        
-        tfidf_path = f"{self.output_dir}/{self.prefix}_tfidf_chi.csv"
-        tfidf_df.to_csv(tfidf_path, index=False, encoding='utf-8-sig')
+        run_write(self.writer, f"CHI-TFIDF -> {self._tfidf_path()}", self._save_tfidf,
+                  tfidf_matrix, selected_features, labels, dates)
+        if budget:
+            budget.checkpoint(f"[{self.prefix}] save CHI-TFIDF")
+
+        if self.correlation:
+            self._save_correlation(tfidf_matrix, labels, dates)
+
+    @staticmethod
+    def _corpus_fingerprint(texts, labels):
+        digest = hashlib.blake2b(digest_size=16)
+        for text, label in zip(texts, labels):
+            digest.update(f"{label}\x00{text}\x00".encode('utf-8'))
+        return len(texts), digest.digest()
+
+    def _write_csv(self, frame, path, description, **kwargs):
+        frame.to_csv(path, encoding='utf-8-sig', **kwargs)
+        print(f"[{self.prefix}] Saved {description} to {path}")
+
+    def _write_dictionary(self, sorted_vocab, dict_path):
+        with open(dict_path, 'w', encoding='utf-8') as f:
+            for word, idx in sorted_vocab:
+                f.write(f"{word} {idx}\n")
+        print(f"[{self.prefix}] Saved dictionary to {dict_path}")
+
+    def _write_index(self, index, index_path):
+        index.save(index_path)
+        print(f"[{self.prefix}] Saved inverted index to {index_path}")
+
+    def _tfidf_path(self):
+        return f"{self.output_dir}/{self.prefix}_tfidf_chi.csv"
+
+    def _save_tfidf(self, tfidf_matrix, selected_features, labels, dates):
+        tfidf_path = self._tfidf_path()
+        n_rows = tfidf_matrix.shape[0]
+        if self.memory_budget:
+            # Densify a block of rows at a time instead of the whole matrix
+            chunk_rows = self.memory_budget.dense_chunk_rows(tfidf_matrix.shape[1], tfidf_matrix.dtype.itemsize)
+        else:
+            chunk_rows = max(1, n_rows)
+        tfidf_matrix = tfidf_matrix.tocsr()
+
+        with open(tfidf_path, 'w', encoding='utf-8-sig', newline='') as f:
+            for lo in range(0, n_rows, chunk_rows):
+                hi = min(lo + chunk_rows, n_rows)
+                # Construct TFIDF output
+                dense_tfidf = tfidf_matrix[lo:hi].toarray()
+                
+                # Create DF
+                tfidf_df = pd.DataFrame(dense_tfidf, columns=selected_features)
+                tfidf_df.insert(0, 'label', labels[lo:hi])
+                tfidf_df.insert(0, 'date', dates[lo:hi])
+                tfidf_df.to_csv(f, index=False, header=(lo == 0))
         print(f"[{self.prefix}] Saved CHI-TFIDF matrix to {tfidf_path}")
+
+    def _save_correlation(self, tfidf_matrix, labels, dates):
+        from src.correlation import correlate, correlate_by_slice, topic_map_fn
+
+        method = self.correlation_method
+        topic_fn = topic_map_fn(self.topic_map) if self.topic_map else None
+        label_corr = correlate(tfidf_matrix, labels, method=method)
+        label_path = f"{self.output_dir}/{self.prefix}_label_correlation.csv"
+        run_write(self.writer, f"label correlation -> {label_path}", self._write_csv,
+                  label_corr, label_path, f"label correlation ({method})")
+
+        topic_corr = correlate(tfidf_matrix, labels, method=method, base_topics=True, topic_fn=topic_fn)
+        if topic_corr.empty:
+            # e.g. every label is mapped to [] in topic_map
+            print(f"[{self.prefix}] No document maps to a base topic; skipping topic correlation.")
+            return
+        topic_path = f"{self.output_dir}/{self.prefix}_topic_correlation.csv"
+        run_write(self.writer, f"base-topic correlation -> {topic_path}", self._write_csv,
+                  topic_corr, topic_path, f"base-topic correlation ({method})")
+
+        if self.correlation_slice:
+            slice_corr = correlate_by_slice(tfidf_matrix, labels, dates, freq=self.correlation_slice,
+                                            method=method, base_topics=True, topic_fn=topic_fn)
+            slice_path = f"{self.output_dir}/{self.prefix}_topic_correlation_{self.correlation_slice}.csv"
+            run_write(self.writer, f"per-slice topic correlation -> {slice_path}", self._write_csv,
+                      slice_corr, slice_path, "per-slice topic correlation", index=False)
+
+    def sweep_features(self, df, top_k_values=None, min_freq_values=None, min_tfidf_values=None, chosen=None):
+        """Tune the CHI-TFIDF filters without rerunning the whole pipeline.
+
+        Vectorization, chi2 and IDF are computed once; every grid point is just a
+        re-mask. The report is saved to ``{prefix}_feature_sweep.csv``. If ``chosen``
+        is a (top_k, min_freq, min_tfidf) tuple, that setting is exported as
+        ``{prefix}_tfidf_chi.csv``; when ``df`` is the corpus of the last ``process``
+        run, it also becomes the selector that ``save_model`` saves.
+        """
+        if df.empty:
+            print(f"[{self.prefix}] No data to sweep.")
+            return None
+
+        from src.feature_selection import FeatureSelector
+
+        texts = df['text_processed'].tolist()
+        labels = df['label'].tolist()
+        dates = df['date'].tolist()
+
+        selector = FeatureSelector(top_k=1000, min_freq=5, min_tfidf=0.01, memory_budget=self.memory_budget)
+        # On the corpus ``process`` ran on, vectorize with its fitted vocabulary so the
+        # swept state stays consistent with ``self.count_vec``
+        same_corpus = self.count_vec is not None and self._corpus_fingerprint(texts, labels) == self._corpus_key
+        if same_corpus:
+            count_vec = self.count_vec
+            fitted = selector.precompute(texts, labels, X_counts=count_vec.transform(texts), count_vec=count_vec)
+        else:
+            fitted = selector.precompute(texts, labels)
+        if not fitted:
+            print(f"[{self.prefix}] Error in vectorization (empty vocab?).")
+            return None
+        report = selector.sweep(top_k_values=top_k_values, min_freq_values=min_freq_values,
+                                min_tfidf_values=min_tfidf_values)
+
+        report_path = f"{self.output_dir}/{self.prefix}_feature_sweep.csv"
+        run_write(self.writer, f"feature sweep report -> {report_path}", self._write_csv,
+                  report, report_path, "feature sweep report", index=False)
+
+        if chosen is not None:
+            tfidf_matrix, selected_features = selector.use_setting(*chosen)
+            run_write(self.writer, f"CHI-TFIDF -> {self._tfidf_path()}", self._save_tfidf,
+                      tfidf_matrix, selected_features, labels, dates)
+            if same_corpus:
+                self.selector = selector
+            elif self.count_vec is not None:
+                print(f"[{self.prefix}] Swept corpus differs from the one process() fitted; "
+                      f"save_model() keeps the process() selection.")
+
+        return report
+
+    def save_model(self, preprocessor, bundle_dir=None):
+        """Save the fitted vocabulary, CHI-TFIDF state and preprocessing as a model bundle.
+
+        The bundle defaults to ``{output_dir}/{prefix}_model`` and can be loaded with
+        ``ModelBundle.load`` to vectorize new documents without refitting.
+        """
+        if self.count_vec is None or self.selector is None:
+            print(f"[{self.prefix}] Nothing fitted yet; run process() before save_model().")
+            return None
+
+        from src.model_bundle import ModelBundle
+
+        if bundle_dir is None:
+            bundle_dir = f"{self.output_dir}/{self.prefix}_model"
+        bundle = ModelBundle.from_fitted(self.prefix, preprocessor, self.count_vec, self.selector)
+        bundle.save(bundle_dir)
+        print(f"[{self.prefix}] Saved model bundle to {bundle_dir}")
+        return bundle_dir
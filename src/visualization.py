@@ -1,12 +1,37 @@
 import os
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
 from wordcloud import WordCloud
 import pandas as pd
+from src.async_writer import run_write
 
 class Visualizer:
-    def __init__(self, output_dir, font_path=None):
+    def __init__(self, output_dir, font_path=None, writer=None):
         self.output_dir = output_dir
         self.font_path = font_path
+        # Fonts are applied per figure rather than through rcParams / sns.set, so
+        # nothing global changes while the writer thread may be saving a figure
+        self.font_prop = FontProperties(fname=font_path) if font_path else None
+        # Optional BackgroundWriter for PNG encoding. Figures are built as standalone
+        # ``Figure`` objects (not pyplot-managed) so they can be saved off the main thread.
+        self.writer = writer
+
+    def _apply_font(self, ax):
+        """Use the configured font (essential for Chinese) for this axes' tick labels."""
+        if self.font_prop is None:
+            return
+        for label in ax.get_xticklabels() + ax.get_yticklabels():
+            label.set_fontproperties(self.font_prop)
+
+    @staticmethod
+    def _save_figure(fig, output_file, message, **kwargs):
+        fig.savefig(output_file, **kwargs)
+        print(message)
+
+    @staticmethod
+    def _save_wordcloud(wc, output_file, message):
+        wc.to_file(output_file)
+        print(message)
 
     def generate_wordcloud(self, df, lang_prefix):
         if df.empty:
@@ -27,8 +52,8 @@ class Visualizer:
 
         # Save to file
         output_file = os.path.join(self.output_dir, f"{lang_prefix}_wordcloud.png")
-        wc.to_file(output_file)
-        print(f"[{lang_prefix}] Saved word cloud to {output_file}")
+        run_write(self.writer, f"word cloud -> {output_file}", self._save_wordcloud, wc, output_file,
+                  f"[{lang_prefix}] Saved word cloud to {output_file}")
         
         # Optional: verify by trying to open or just print success
 
@@ -75,24 +100,48 @@ class Visualizer:
             top_features = max_scores.nlargest(top_n_features).index
             heatmap_data = heatmap_data[top_features]
             
-        plt.figure(figsize=(12, 8))
+        fig = Figure(figsize=(12, 8))
+        ax = fig.subplots()
+        sns.heatmap(heatmap_data, cmap="YlGnBu", annot=False, ax=ax)
         # Use a chinese-compatible font if provided
-        if self.font_path:
-            # Seaborn/Matplotlib font setting
-            from matplotlib.font_manager import FontProperties
-            prop = FontProperties(fname=self.font_path)
-            plt.rcParams['font.family'] = prop.get_name()
-            # Also sometimes need to set explicitly for sns
-            sns.set(font=prop.get_name())
-            
-        sns.heatmap(heatmap_data, cmap="YlGnBu", annot=False)
-        plt.title(f"{lang_prefix.upper()} Feature Importance Heatmap (Top {top_n_features})")
+        self._apply_font(ax)
+        ax.set_title(f"{lang_prefix.upper()} Feature Importance Heatmap (Top {top_n_features})",
+                     fontproperties=self.font_prop)
         
         # Adjust layout
-        plt.tight_layout()
+        fig.tight_layout()
         
         output_file = os.path.join(self.output_dir, f"{lang_prefix}_heatmap.png")
-        plt.savefig(output_file, dpi=300)
-        plt.close()
-        
-        print(f"[{lang_prefix}] Saved heatmap to {output_file}")
+        run_write(self.writer, f"heatmap -> {output_file}", self._save_figure, fig, output_file,
+                  f"[{lang_prefix}] Saved heatmap to {output_file}", dpi=300)
+
+    def generate_correlation_heatmap(self, corr_df, output_file, title='主题相关性热力图', annot_max=20):
+        """Plot a square label/topic similarity matrix (see src/correlation.py).
+
+        Cell values are annotated only up to ``annot_max`` rows to keep large
+        matrices readable.
+        """
+        try:
+            import seaborn as sns
+        except ImportError:
+            print("Seaborn not installed.")
+            return
+
+        if corr_df.empty:
+            print(f"No correlation data for {output_file}.")
+            return
+
+        n = len(corr_df)
+        size = max(8, n * 0.35)
+        fig = Figure(figsize=(size, size * 0.75))
+        ax = fig.subplots()
+        # Pearson similarities can be negative; cosine on TF-IDF cannot
+        vmin = -1 if (corr_df.values < 0).any() else 0
+        sns.heatmap(corr_df, annot=n <= annot_max, cmap='Blues', vmin=vmin, vmax=1, fmt='.3f',
+                    linewidths=1 if n <= annot_max else 0, linecolor='white', ax=ax)
+        self._apply_font(ax)
+        ax.set_title(title, fontsize=15, fontproperties=self.font_prop)
+        fig.tight_layout()
+
+        run_write(self.writer, f"correlation heatmap -> {output_file}", self._save_figure, fig, output_file,
+                  f"Saved correlation heatmap to {output_file}", dpi=300, bbox_inches='tight')